@@ -4,12 +4,57 @@ Combina datos de exportaciones (FOB) e importaciones (CIF) para visualizar
 el balance comercial bilateral, composición de exportaciones e importaciones.
 Datos: Banco Central del Ecuador (BCE), 2000–2025.
 """
+import time
+
+_T0 = time.perf_counter()
+
+import contextlib
+import errno
+import functools
+import hashlib
+import importlib
+import inspect
+import io
+import json
 import os
+import re
+import shutil
+import threading
 import unicodedata
+import uuid
+import zipfile
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+
+
+class _Diferido:
+    """Módulo que se importa recién en el primer acceso a uno de sus atributos.
+
+    pandas y plotly.express suman más de medio segundo de import; así el shell
+    de la página se dibuja antes de pagarlo. No usa importlib.util.LazyLoader
+    porque este registra el módulo en sys.modules y cualquier recorrido de
+    sys.modules (Streamlit llama a inspect.stack en el primer comando) lo carga.
+    """
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def __getattr__(self, attr):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nombre)
+        return getattr(self._modulo, attr)
+
+
+np = _Diferido("numpy")
+pd = _Diferido("pandas")
+go = _Diferido("plotly.graph_objects")
+px = _Diferido("plotly.express")
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # ── Configuración de página ──────────────────────────────────────────
 st.set_page_config(
@@ -22,12 +67,66 @@ PLOT_BG = "white"
 GRID_COLOR = "#f0f0f0"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Volumen (TM_Peso_Neto) y valor unitario implícito en la sección 2.
+# Con BALANZA_VOLUMEN=0 la columna TM ni siquiera se lee del parquet.
+MOSTRAR_VOLUMEN = os.environ.get("BALANZA_VOLUMEN", "1") != "0"
+
+# Tamaño de los treemaps (los gráficos con más puntos): hojas fuera del top-K
+# o por debajo de la participación mínima (% del total) se agrupan en "Otros".
+# No es un presupuesto por gráfico: son dos límites globales para los treemaps.
+TREEMAP_TOP_K = int(os.environ.get("BALANZA_TREEMAP_TOP_K", "40"))
+TREEMAP_MIN_PCT = float(os.environ.get("BALANZA_TREEMAP_MIN_PCT", "0.1"))
+PAYLOAD_DECIMALES = 3  # barras/líneas: millones USD → precisión de miles USD
+
+# Cache persistente en disco compartido entre procesos/réplicas (desactivado si
+# BALANZA_CACHE_DIR no está definido). Se desalojan las entradas menos usadas
+# cuando el directorio supera BALANZA_CACHE_MAX_MB.
+CACHE_DIR = os.environ.get("BALANZA_CACHE_DIR")
+CACHE_MAX_MB = float(os.environ.get("BALANZA_CACHE_MAX_MB", "512"))
+
+# Selecciones (país/región × rango) cuyos agregados se guardan en memoria en
+# cada réplica; las menos usadas se descartan. Hay decenas de miles posibles.
+AGREGADOS_MAX_ENTRADAS = int(os.environ.get("BALANZA_AGREGADOS_MAX_ENTRADAS", "256"))
+
+# Validación de calidad en cada carga (ver _validar_carga). Con
+# BALANZA_VALIDACION=estricta la app se detiene si hay hallazgos; si no, se
+# listan al pie de la página. scripts/validar_datos.py valida fuera de la app.
+VALIDACION_ESTRICTA = os.environ.get("BALANZA_VALIDACION") == "estricta"
+
+ARCHIVOS_DATOS = ["exportaciones_ecuador.parquet", "importaciones_ecuador.parquet"]
+
+# Con BALANZA_DEBUG=1 se miden tiempos por etapa y el payload de cada gráfico,
+# y se muestran en el sidebar (scripts/benchmark.py los lee de ahí)
+INSTRUMENTACION = os.environ.get("BALANZA_DEBUG") == "1"
+
+_metricas = {"tiempos_ms": {}, "payload_bytes": {}, "validacion_ms": {}}
+
+
+def _marcar(etapa):
+    """Registra los ms transcurridos desde el inicio del script hasta `etapa`."""
+    _metricas["tiempos_ms"][etapa] = round((time.perf_counter() - _T0) * 1000, 1)
+
+
+_marcar("imports")
+
 st.markdown("""
 <style>
     [data-testid="stSidebar"] { min-width: 200px; max-width: 200px; }
 </style>
 """, unsafe_allow_html=True)
 
+# ── Shell de la página ───────────────────────────────────────────────
+# Se dibuja antes de cargar los datos; en la primera carga de cada sesión
+# muestra un esqueleto mientras se leen los parquets.
+
+st.sidebar.title("Filtros")
+esqueleto = st.empty()
+if "_datos_listos" not in st.session_state:
+    with esqueleto.container():
+        st.title("Balanza Comercial del Ecuador")
+        st.info("Cargando datos del Banco Central del Ecuador…", icon="⏳")
+_marcar("shell")
+
 # ── Diccionarios de colores ──────────────────────────────────────────
 
 PRODUCT_COLORS = {
@@ -224,6 +323,41 @@ def _get_subgrupo_color(name, idx=0):
     return SUBGRUPO_COLORS.get(name, _FALLBACK_COLORS[idx % len(_FALLBACK_COLORS)])
 
 
+# ── Payload de gráficos ──────────────────────────────────────────────
+
+def _podar_hojas(df, padre, hoja, valor):
+    """Agrupa en "Otros" (dentro de su mismo padre) las hojas fuera del top
+    TREEMAP_TOP_K o con participación menor a TREEMAP_MIN_PCT del total."""
+    df = df[df[valor] > 0]
+    rank = df[valor].rank(method="first", ascending=False)
+    pct = df[valor] / df[valor].sum() * 100
+    chica = (rank > TREEMAP_TOP_K) | (pct < TREEMAP_MIN_PCT)
+    out = (df.assign(**{hoja: df[hoja].where(~chica, "Otros")})
+             .groupby([padre, hoja], observed=True, as_index=False)[valor].sum())
+    # Sin redondeo: con plotly>=6 `values` viaja como typed array de ancho fijo
+    # (no ahorra bytes) y redondear borraría hojas de menos de USD 500
+    return out
+
+
+def _mostrar_grafico(fig, nombre):
+    """st.plotly_chart con arrays numéricos compactos (redondeados a
+    PAYLOAD_DECIMALES y codificados como float32) y registro del payload."""
+    for tr in fig.data:
+        if tr.type not in ("scatter", "bar"):
+            continue
+        for eje in ("x", "y"):
+            v = getattr(tr, eje)
+            if v is None:
+                continue
+            arr = np.asarray(v)
+            if arr.dtype.kind == "f":
+                # plotly>=6 los manda como typed arrays base64: float32 = 4 bytes
+                tr[eje] = np.round(arr, PAYLOAD_DECIMALES).astype("float32")
+    if INSTRUMENTACION:
+        _metricas["payload_bytes"][nombre] = len(fig.to_json(validate=False))
+    st.plotly_chart(fig, width="stretch")
+
+
 # ── Normalización y regiones ─────────────────────────────────────────
 
 def _normalizar(s):
@@ -323,15 +457,335 @@ def _asignar_region(pais: str) -> str:
     return "Otros"
 
 
+# ── Volumen y precio implícito ───────────────────────────────────────
+
+def _precio_volumen(df, claves, anios):
+    """Descompone la variación interanual del FOB en efecto volumen y efecto precio.
+
+    Trabaja sobre la grilla completa `claves` × `anios` (años sin envíos = 0).
+    Con Q = toneladas y P = USD/TM:  ΔFOB = P0·ΔQ (volumen) + Q1·ΔP (precio).
+    Cuando P0 o P1 no existe (altas, bajas o registros sin peso) la variación
+    completa queda en "Otros" para que las tres partes sumen exactamente ΔFOB.
+    """
+    g = df.groupby(claves + ["Anio"], observed=True)[["FOB", "TM"]].sum().reset_index()
+    grilla = (g[claves].drop_duplicates()
+              .merge(pd.DataFrame({"Anio": list(anios)}), how="cross"))
+    g = (grilla.merge(g, on=claves + ["Anio"], how="left")
+               .fillna({"FOB": 0, "TM": 0})
+               .sort_values(claves + ["Anio"], ignore_index=True))
+    g["VU"] = g["FOB"] * 1e6 / g["TM"].where(g["TM"] > 0)  # USD por tonelada
+    prev = g.groupby(claves, observed=True)[["FOB", "TM", "VU"]].shift(1)
+    g["Var_FOB"] = g["FOB"] - prev["FOB"]
+    g["Efecto_Volumen"] = prev["VU"] * (g["TM"] - prev["TM"]) / 1e6
+    g["Efecto_Precio"] = g["TM"] * (g["VU"] - prev["VU"]) / 1e6
+    # Sin precio en alguno de los dos años no hay descomposición: todo a "Otros"
+    sin_precio = g["VU"].isna() | prev["VU"].isna()
+    g.loc[sin_precio, ["Efecto_Volumen", "Efecto_Precio"]] = 0.0
+    # La fila del primer año no tiene base de comparación
+    g.loc[prev["FOB"].isna(), ["Efecto_Volumen", "Efecto_Precio"]] = float("nan")
+    g["Efecto_Otros"] = g["Var_FOB"] - g["Efecto_Volumen"] - g["Efecto_Precio"]
+    return g
+
+
+# ── Cache persistente ────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=None)
+def _huella_parquet(path, size, mtime_ns):
+    # El footer del parquet (esquema + estadísticas de cada row group) cambia con
+    # cualquier cambio de contenido; hashearlo evita leer el archivo completo y,
+    # a diferencia de mtime, coincide entre réplicas con checkouts distintos.
+    with open(path, "rb") as f:
+        f.seek(max(0, size - 65536))
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def _huella_codigo(path, size, mtime_ns):
+    # Hash del código completo de la app: un deploy que cambie los diccionarios
+    # de códigos, los patrones de región o cualquier agregación invalida el
+    # cache persistente, como hace st.cache_data con el código de cada función.
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _version_datos():
+    """Versión del dataset: tamaño + huella del footer de cada parquet."""
+    partes = []
+    for nombre in ARCHIVOS_DATOS:
+        path = os.path.join(BASE_DIR, "data", nombre)
+        info = os.stat(path)
+        partes.append(f"{info.st_size}-{_huella_parquet(path, info.st_size, info.st_mtime_ns)}")
+    return "_".join(partes)
+
+
+@contextlib.contextmanager
+def _bloqueo(ruta):
+    """Lock exclusivo entre procesos sobre el archivo `ruta`."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            # LK_LOCK se rinde a los ~10 s con EDEADLOCK, y quien tiene el lock
+            # puede estar calculando una carga en frío más larga: reintentar
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError as e:
+                    if e.errno != errno.EDEADLOCK:
+                        raise
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _leer_entrada(destino):
+    """Lee una entrada del cache; None si no existe o está incompleta."""
+    try:
+        with open(os.path.join(destino, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        tablas = {k: pd.read_parquet(os.path.join(destino, f"{i}.parquet"))
+                  for i, k in enumerate(meta["claves"])}
+        os.utime(destino)  # LRU: la fecha de modificación marca el último uso
+    except (OSError, ValueError, KeyError):
+        return None
+    return tablas if meta["dict"] else tablas[None]
+
+
+def _escribir_entrada(destino, resultado):
+    """Escribe en un directorio temporal y lo publica con un rename atómico.
+    Devuelve los bytes escritos (0 si falló)."""
+    tablas = resultado if isinstance(resultado, dict) else {None: resultado}
+    tmp = f"{destino}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp)
+    try:
+        for i, df in enumerate(tablas.values()):
+            df.to_parquet(os.path.join(tmp, f"{i}.parquet"))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dict": isinstance(resultado, dict), "claves": list(tablas)}, f)
+        size = sum(a.stat().st_size for a in os.scandir(tmp))
+        os.replace(tmp, destino)
+        return size
+    except (OSError, ValueError, TypeError, NotImplementedError):
+        # Cache best-effort: el resultado ya está calculado. pyarrow falla con
+        # ArrowInvalid (ValueError), ArrowTypeError (TypeError) o
+        # ArrowNotImplementedError si una tabla no se puede guardar como parquet
+        return 0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _desalojar():
+    """Borra las entradas menos usadas hasta quedar bajo CACHE_MAX_MB.
+    Devuelve el tamaño que queda en bytes."""
+    with _bloqueo(os.path.join(CACHE_DIR, ".lock")):
+        entradas = []
+        for prefijo in os.scandir(CACHE_DIR):
+            if not prefijo.is_dir():
+                continue
+            for e in os.scandir(prefijo.path):
+                if not e.is_dir() or ".tmp-" in e.name:
+                    continue
+                try:
+                    size = sum(a.stat().st_size for a in os.scandir(e.path))
+                    entradas.append((e.stat().st_mtime, size, e.path))
+                except OSError:
+                    continue
+        total = sum(size for _, size, _ in entradas)
+        limite = CACHE_MAX_MB * 1024 * 1024
+        for _, size, path in sorted(entradas):
+            if total <= limite:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            with contextlib.suppress(OSError):
+                os.remove(path + ".lock")
+            total -= size
+        return total
+
+
+_DESALOJO_CADA = 50  # escrituras entre recorridos aunque el estimado no llegue al límite
+
+
+@st.cache_resource
+def _estado_desalojo():
+    """Tamaño estimado del cache según este proceso, compartido entre sesiones."""
+    return {"lock": threading.Lock(), "bytes": None, "escrituras": 0}
+
+
+def _quizas_desalojar(escritos):
+    """Llama a _desalojar (recorre todo el directorio bajo el lock global) solo
+    si el tamaño estimado supera CACHE_MAX_MB, en la primera escritura del
+    proceso o cada _DESALOJO_CADA escrituras: el estimado no ve lo que escriben
+    otras réplicas, así que se corrige de vez en cuando con un recorrido real."""
+    estado = _estado_desalojo()
+    with estado["lock"]:
+        estado["escrituras"] += 1
+        if estado["bytes"] is not None:
+            estado["bytes"] += escritos
+            if (estado["bytes"] <= CACHE_MAX_MB * 1024 * 1024
+                    and estado["escrituras"] % _DESALOJO_CADA):
+                return
+    total = _desalojar()
+    with estado["lock"]:
+        estado["bytes"] = total
+
+
+def _cache_persistente(func):
+    """Cache en disco (BALANZA_CACHE_DIR) para funciones que devuelven un
+    DataFrame o un dict de DataFrames, guardados como parquet.
+
+    La clave es el hash del código de la app (ver _huella_codigo), la función y
+    sus argumentos; como en st.cache_data, los argumentos con prefijo "_" no se
+    hashean, por eso cada función recibe la versión del dataset explícitamente. Se calcula bajo un lock por clave:
+    si varias réplicas piden lo mismo a la vez, solo una lo calcula.
+    """
+    if not CACHE_DIR:
+        return func
+    firma = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        ligados = firma.bind(*args, **kwargs)
+        ligados.apply_defaults()
+        clave_args = sorted((k, v) for k, v in ligados.arguments.items() if not k.startswith("_"))
+        info = os.stat(__file__)
+        codigo = _huella_codigo(__file__, info.st_size, info.st_mtime_ns)
+        clave = hashlib.sha256(
+            repr((codigo, func.__qualname__, clave_args)).encode()
+        ).hexdigest()
+        destino = os.path.join(CACHE_DIR, clave[:2], clave)
+        resultado = _leer_entrada(destino)
+        if resultado is not None:
+            return resultado
+        with _bloqueo(destino + ".lock"):
+            # Otro proceso pudo haberla escrito mientras esperábamos el lock
+            resultado = _leer_entrada(destino)
+            if resultado is not None:
+                return resultado
+            resultado = func(*args, **kwargs)
+            escritos = _escribir_entrada(destino, resultado)
+        if not escritos:
+            # Sin entrada, _desalojar nunca vería su .lock: se borra aquí, ya
+            # liberado (en Windows no se puede borrar un archivo abierto)
+            with contextlib.suppress(OSError):
+                os.remove(destino + ".lock")
+            return resultado
+        _quizas_desalojar(escritos)
+        return resultado
+
+    return wrapper
+
+
+# ── Validación de datos ──────────────────────────────────────────────
+# Corre dentro de cada carga, sobre el parquet crudo ya en memoria y el
+# agregado recién calculado: no vuelve a leer nada y solo usa operaciones
+# vectorizadas (el recorrido por filas queda para los pocos hallazgos).
+
+COLUMNAS_INFORME = ["Flujo", "Chequeo", "Detalle", "Registros", "Valor"]
+
+
+def _validar_carga(flujo, crudo, agg, *, claves, unicas, medidas, codigos, pais, valor):
+    """Informe de calidad de una carga: un hallazgo por fila (vacío si todo está bien).
+
+    claves:  columnas clave del parquet, que no deberían tener nulos (solo se
+             revisan si los totales no cuadran, que es cuando pesan)
+    unicas:  clave del agregado ya normalizada (país sin acentos, códigos como
+             texto); dos variantes de un mismo país o código la duplican
+    medidas: (columna del parquet, columna del agregado, divisor) cuyos totales
+             deben coincidir y que no deberían ser negativas ni nulas
+    codigos: {columna del agregado: diccionario que debería cubrirla}
+    pais, valor: columna de país y de monto (millones USD) del agregado
+
+    "Valor" es el monto afectado: millones USD, o la unidad de la medida en
+    los chequeos de negativos y totales. En "Total distinto al parquet",
+    "Registros" son las filas descartadas por claves nulas (vacío si ninguna).
+    """
+    hallazgos = []
+
+    def por_grupo(chequeo, mascara, col, detalle="{}"):
+        # Lo habitual es que no haya hallazgos: sin groupby en ese caso
+        if mascara.any():
+            montos = agg[valor][mascara].groupby(agg[col][mascara])
+            for k, (n, v) in montos.agg(["size", "sum"]).iterrows():
+                hallazgos.append((flujo, chequeo, detalle.format(k), n, v))
+
+    for col, mapa in codigos.items():
+        por_grupo("Código sin mapear", ~agg[col].isin(list(mapa)), col, f"{col}={{}}")
+    por_grupo("País sin región", agg["Region"] == "Otros", pais)
+
+    duplicadas = agg.duplicated(unicas, keep=False)
+    if duplicadas.any():
+        ej = agg.loc[duplicadas, unicas].iloc[0]
+        hallazgos.append((flujo, "Clave duplicada",
+                          ", ".join(f"{k}={v}" for k, v in ej.items()) + " (ej.)",
+                          duplicadas.sum(), agg.loc[duplicadas, valor].sum()))
+
+    descuadres = []
+    for col, col_agg, divisor in medidas:
+        v = crudo[col].to_numpy(dtype="float64", na_value=np.nan)
+        negativos = v < 0
+        n_nulos = np.isnan(v).sum()
+        if n_nulos:
+            hallazgos.append((flujo, "Valor nulo", col, n_nulos, float("nan")))
+        if negativos.any():
+            hallazgos.append((flujo, "Valor negativo", col, negativos.sum(),
+                              v[negativos].sum() / divisor))
+        total_crudo = np.nansum(v) / divisor
+        total_agg = agg[col_agg].sum()
+        if not np.isclose(total_crudo, total_agg, rtol=1e-9, atol=1e-6):
+            descuadres.append((col, total_crudo, total_agg))
+
+    # Las filas con claves nulas son las que el groupby de la carga descarta:
+    # se cuentan (recorrido completo de columnas de texto) solo si no cuadra,
+    # y son los registros que explican la diferencia (vacío si no hay ninguno)
+    if descuadres:
+        descartadas = np.zeros(len(crudo), dtype=bool)
+        for col in claves:
+            nulos = crudo[col].isna().to_numpy()
+            if nulos.any():
+                hallazgos.append((flujo, "Valor nulo", col, nulos.sum(), float("nan")))
+                descartadas |= nulos
+        for col, total_crudo, total_agg in descuadres:
+            hallazgos.append((flujo, "Total distinto al parquet",
+                              f"{col}: parquet {total_crudo:,.3f} vs cargado {total_agg:,.3f}",
+                              descartadas.sum() or None, total_crudo - total_agg))
+
+    informe = pd.DataFrame(hallazgos, columns=COLUMNAS_INFORME)
+    return informe.astype({"Registros": "Int64", "Valor": "float64"})
+
+
+def _registrar_validacion(flujo, t_inicio, t_chequeos):
+    """Tiempo de la carga completa y de sus chequeos (solo en cache frío)."""
+    fin = time.perf_counter()
+    _metricas["validacion_ms"][flujo] = {
+        "carga": round((fin - t_inicio) * 1000, 1),
+        "chequeos": round((fin - t_chequeos) * 1000, 1),
+    }
+
+
 # ── Carga de datos ──────────────────────────────────────────────────
+# Cada carga devuelve {"datos": agregado, "validacion": informe de calidad}.
 
 @st.cache_data
-def load_export_data():
+@_cache_persistente
+def load_export_data(version, con_volumen=True):
+    t_inicio = time.perf_counter()
     path = os.path.join(BASE_DIR, "data", "exportaciones_ecuador.parquet")
-    cols = ["Anio", "Pais_Destino", "Codigo_PP", "PP", "FOB", "TM_Peso_Neto"]
+    cols = ["Anio", "Pais_Destino", "Codigo_PP", "PP", "FOB"]
+    aggs = {"FOB": ("FOB", "sum")}
+    if con_volumen:
+        cols.append("TM_Peso_Neto")
+        aggs["TM"] = ("TM_Peso_Neto", "sum")
     df = pd.read_parquet(path, columns=cols)
     agg = (df.groupby(["Anio", "Pais_Destino", "Codigo_PP", "PP"], observed=True)
-             .agg(FOB=("FOB", "sum"), TM=("TM_Peso_Neto", "sum"))
+             .agg(**aggs)
              .reset_index())
     agg["FOB"] = agg["FOB"] / 1000  # miles → millones USD
     agg["Codigo_PP"] = agg["Codigo_PP"].astype(str)
@@ -339,11 +793,24 @@ def load_export_data():
     agg["Sector"] = agg["Cod_Sector"].map(SECTOR_MAP).fillna("No Definido")
     agg["Pais_Norm"] = agg["Pais_Destino"].apply(_normalizar)
     agg["Region"] = agg["Pais_Destino"].apply(_asignar_region)
-    return agg
+
+    t_chequeos = time.perf_counter()
+    medidas = [("FOB", "FOB", 1000)] + ([("TM_Peso_Neto", "TM", 1)] if con_volumen else [])
+    informe = _validar_carga(
+        "Exportaciones", df, agg,
+        claves=["Anio", "Pais_Destino", "Codigo_PP", "PP"],
+        unicas=["Anio", "Pais_Norm", "Codigo_PP"],
+        medidas=medidas, codigos={"Cod_Sector": SECTOR_MAP},
+        pais="Pais_Destino", valor="FOB",
+    )
+    _registrar_validacion("Exportaciones", t_inicio, t_chequeos)
+    return {"datos": agg, "validacion": informe}
 
 
 @st.cache_data
-def load_import_data():
+@_cache_persistente
+def load_import_data(version):
+    t_inicio = time.perf_counter()
     path = os.path.join(BASE_DIR, "data", "importaciones_ecuador.parquet")
     cols = ["Anio", "Pais_Origen", "Cod_Grupo", "Cod_Subgrupo", "CIF"]
     df = pd.read_parquet(path, columns=cols)
@@ -360,44 +827,250 @@ def load_import_data():
     agg["CIF"] = agg["CIF"] / 1000  # miles → millones USD
     agg["Pais_Norm"] = agg["Pais_Origen"].apply(_normalizar)
     agg["Region"] = agg["Pais_Origen"].apply(_asignar_region)
-    return agg
 
+    t_chequeos = time.perf_counter()
+    informe = _validar_carga(
+        "Importaciones", df, agg,
+        claves=["Anio", "Pais_Origen", "Cod_Grupo", "Cod_Subgrupo"],
+        unicas=["Anio", "Pais_Norm", "Cod_Grupo", "Cod_Subgrupo"],
+        medidas=[("CIF", "CIF", 1000)],
+        codigos={"Cod_Grupo": GRUPO_MAP, "Cod_Subgrupo": SUBGRUPO_MAP},
+        pais="Pais_Origen", valor="CIF",
+    )
+    _registrar_validacion("Importaciones", t_inicio, t_chequeos)
+    return {"datos": agg, "validacion": informe}
 
-@st.cache_data
-def build_country_list(_df_exp, _df_imp):
-    """Construye lista unificada de países con su región, prefiriendo nombre de exportaciones."""
-    exp_map = {_normalizar(c): c for c in _df_exp["Pais_Destino"].unique()}
-    imp_map = {_normalizar(c): c for c in _df_imp["Pais_Origen"].unique()}
-    all_norm = sorted(set(exp_map.keys()) | set(imp_map.keys()))
+
+TODOS_LABEL = "— Todos —"
+PAIS_DEFAULT = "COLOMBIA"
+
+
+@st.cache_resource
+def build_selection_catalog(_df_exp, _df_imp, version):
+    """Catálogo de filtros construido una vez por versión del dataset.
+
+    Une los países de ambos flujos (prefiriendo el nombre de exportaciones) y
+    reutiliza la `Region` que ya calcularon las cargas. Se comparte entre
+    sesiones sin copiarse: no modificar.
+    """
+    cols = ["Pais_Norm", "Pais", "Region"]
+    # Entre variantes de un mismo país gana la última en orden de primera
+    # aparición, como {_normalizar(c): c for c in df[col].unique()}
+    paises = (pd.concat([
+                  _df_exp.rename(columns={"Pais_Destino": "Pais"})[cols]
+                         .drop_duplicates("Pais")
+                         .drop_duplicates("Pais_Norm", keep="last"),
+                  _df_imp.rename(columns={"Pais_Origen": "Pais"})[cols]
+                         .drop_duplicates("Pais")
+                         .drop_duplicates("Pais_Norm", keep="last"),
+              ])
+              .drop_duplicates("Pais_Norm")
+              .astype({"Pais": str, "Region": str})
+              .sort_values("Pais"))
     # display_name → (norm_key, region)
-    result = {}
-    for n in all_norm:
-        display = exp_map.get(n, imp_map.get(n, n))
-        region = _asignar_region(display)
-        result[display] = (n, region)
-    return result
+    pais = dict(zip(paises["Pais"], zip(paises["Pais_Norm"], paises["Region"])))
+
+    todos = tuple(paises["Pais"])
+    opciones = {"Todas": todos}
+    default_idx = {"Todas": todos.index(PAIS_DEFAULT) if PAIS_DEFAULT in todos else 0}
+    claves = {}
+    for region, grupo in paises.groupby("Region", sort=False):
+        opciones[region] = (TODOS_LABEL,) + tuple(grupo["Pais"])
+        default_idx[region] = 0  # "— Todos —" seleccionado por defecto al cambiar región
+        claves[region] = tuple(sorted(grupo["Pais_Norm"]))
+    regiones = sorted(claves, key=lambda r: REGION_ORDER.index(r) if r in REGION_ORDER else 99)
+
+    return {
+        "pais": pais,
+        "regiones": ["Todas"] + regiones,
+        "opciones": opciones,
+        "default_idx": default_idx,
+        "claves": claves,
+        "anios": (min(int(_df_exp["Anio"].min()), int(_df_imp["Anio"].min())),
+                  max(int(_df_exp["Anio"].max()), int(_df_imp["Anio"].max()))),
+    }
+
+
+# ── Agregados por selección ──────────────────────────────────────────
+
+def _filtrar(df, norm_keys, rango):
+    return df[
+        (df["Pais_Norm"].isin(norm_keys)) &
+        (df["Anio"] >= rango[0]) & (df["Anio"] <= rango[1])
+    ]
+
+
+@st.cache_data(max_entries=AGREGADOS_MAX_ENTRADAS)
+@_cache_persistente
+def agregar_exportaciones(_df_exp, version, norm_keys, rango, por_pais, con_volumen):
+    """Tablas de exportación de una selección (país o región) y rango de años."""
+    df = _filtrar(_df_exp, norm_keys, rango)
+    prod_total = (df.groupby("PP")["FOB"].sum()
+                  .sort_values(ascending=False).reset_index())
+    top8 = prod_total.head(10)["PP"].tolist()
+
+    exp_pivot = df.copy()
+    exp_pivot["PP_grupo"] = exp_pivot["PP"].where(exp_pivot["PP"].isin(top8), "RESTO")
+    exp_area = exp_pivot.groupby(["Anio", "PP_grupo"])["FOB"].sum().reset_index()
+    exp_area_total = exp_area.groupby("Anio")["FOB"].sum().rename("Total")
+    exp_area = exp_area.merge(exp_area_total, on="Anio")
+    exp_area["Pct"] = (exp_area["FOB"] / exp_area["Total"].replace(0, 1) * 100).round(1)
+
+    res = {
+        "anual": df.groupby("Anio")["FOB"].sum().reset_index(),
+        "prod_total": prod_total,
+        "area": exp_area,
+        "tree": (df.groupby(["Sector", "PP"])["FOB"].sum()
+                 .reset_index().rename(columns={"FOB": "FOB_total"})),
+    }
+    if con_volumen and not df.empty:
+        # Por producto y, en modo región, por producto y país socio
+        claves_pv = ["Pais_Destino", "PP"] if por_pais else ["PP"]
+        pv = _precio_volumen(df, claves_pv, range(rango[0], rango[1] + 1))
+        pv_prod = pv[pv["PP"].isin(top8)].groupby(["PP", "Anio"])[["FOB", "TM"]].sum()
+        pv_prod["VU"] = pv_prod["FOB"] * 1e6 / pv_prod["TM"].where(pv_prod["TM"] > 0)
+        res["volumen"] = pv_prod.reset_index()
+        res["descomp"] = (pv.groupby("Anio")[["Var_FOB", "Efecto_Volumen",
+                                              "Efecto_Precio", "Efecto_Otros"]]
+                            .sum(min_count=1).reset_index().dropna(subset=["Var_FOB"]))
+    return res
+
+
+@st.cache_data(max_entries=AGREGADOS_MAX_ENTRADAS)
+@_cache_persistente
+def agregar_importaciones(_df_imp, version, norm_keys, rango):
+    """Tablas de importación de una selección (país o región) y rango de años."""
+    df = _filtrar(_df_imp, norm_keys, rango)
+    sub_total = (df.groupby("Subgrupo")["CIF"].sum()
+                 .sort_values(ascending=False).reset_index())
+    top8s = sub_total.head(10)["Subgrupo"].tolist()
+
+    imp_pivot = df.copy()
+    imp_pivot["Sub_grupo"] = imp_pivot["Subgrupo"].where(
+        imp_pivot["Subgrupo"].isin(top8s), "RESTO")
+    imp_area = imp_pivot.groupby(["Anio", "Sub_grupo"])["CIF"].sum().reset_index()
+    imp_area_total = imp_area.groupby("Anio")["CIF"].sum().rename("Total")
+    imp_area = imp_area.merge(imp_area_total, on="Anio")
+    imp_area["Pct"] = (imp_area["CIF"] / imp_area["Total"].replace(0, 1) * 100).round(1)
+
+    return {
+        "anual": df.groupby("Anio")["CIF"].sum().reset_index(),
+        "sub_total": sub_total,
+        "area": imp_area,
+        "tree": (df.groupby(["Grupo", "Subgrupo"])["CIF"].sum()
+                 .reset_index().rename(columns={"CIF": "CIF_total"})),
+    }
+
+
+# ── Descargas ────────────────────────────────────────────────────────
+# Los archivos se generan recién al hacer clic: Streamlit ejecuta el callable
+# de st.download_button en un hilo aparte, sin bloquear el script ni a otras
+# sesiones. Se escriben por bloques de filas desde los agregados ya cacheados
+# a un único buffer; en los ZIP, directo a cada entrada del archivo (ningún
+# formato necesita seek), sin copias intermedias por tabla.
+
+FORMATOS_DESCARGA = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+_FILAS_POR_BLOQUE = 50_000
+
+
+def _bloques(df):
+    # Al menos un bloque, para que una tabla vacía conserve sus encabezados
+    for i in range(0, max(len(df), 1), _FILAS_POR_BLOQUE):
+        yield i, df.iloc[i:i + _FILAS_POR_BLOQUE]
+
+
+def _escribir_tabla(df, f, formato):
+    """Escribe `df` en el archivo binario `f` (basta con write) en el formato indicado."""
+    if formato == "CSV":
+        f.write(b"\xef\xbb\xbf")  # BOM: Excel abre bien las tildes
+        for i, bloque in _bloques(df):
+            f.write(bloque.to_csv(index=False, header=(i == 0)).encode())
+    elif formato == "Parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        esquema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(f, esquema) as escritor:
+            for _, bloque in _bloques(df):
+                escritor.write_table(
+                    pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+    else:  # XLSX
+        from openpyxl import Workbook
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet("datos")
+        hoja.append([str(c) for c in df.columns])
+        for _, bloque in _bloques(df):
+            bloque = bloque.astype(object).where(bloque.notna(), None)
+            for fila in bloque.itertuples(index=False):
+                hoja.append(list(fila))
+        libro.save(f)
+
+
+def _generador_descarga(tablas, formato):
+    """Callable sin argumentos para st.download_button. Una tabla va como
+    archivo suelto; varias, como ZIP con un archivo por tabla."""
+    ext, _ = FORMATOS_DESCARGA[formato]
+
+    def generar():
+        buf = io.BytesIO()
+        if len(tablas) == 1:
+            _escribir_tabla(next(iter(tablas.values())), buf, formato)
+        else:
+            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+                for nombre, df in tablas.items():
+                    with zf.open(f"{nombre}.{ext}", "w") as entrada:
+                        _escribir_tabla(df, entrada, formato)
+        buf.seek(0)
+        return buf
+
+    return generar
+
+
+def _boton_descarga(tablas, nombre, formato, etiqueta="Descargar datos", contenedor=st):
+    """Botón de descarga diferida de `tablas` ({nombre: DataFrame})."""
+    ext, mime = FORMATOS_DESCARGA[formato]
+    if len(tablas) > 1:
+        ext, mime = "zip", "application/zip"
+    contenedor.download_button(
+        f"⬇ {etiqueta} ({formato})",
+        data=_generador_descarga(tablas, formato),
+        file_name=f"{nombre}.{ext}",
+        mime=mime,
+        on_click="ignore",
+        key=f"descarga_{nombre}",
+    )
 
 
 # ── Cargar datos ─────────────────────────────────────────────────────
 
-df_exp = load_export_data()
-df_imp = load_import_data()
-country_map = build_country_list(df_exp, df_imp)
+version_datos = _version_datos()
+carga_exp = load_export_data(version_datos, MOSTRAR_VOLUMEN)
+carga_imp = load_import_data(version_datos)
+df_exp, df_imp = carga_exp["datos"], carga_imp["datos"]
+informe_calidad = pd.concat([carga_exp["validacion"], carga_imp["validacion"]],
+                            ignore_index=True)
+st.session_state["_validacion"] = informe_calidad  # lo lee scripts/validar_datos.py
+catalogo = build_selection_catalog(df_exp, df_imp, version_datos)
+esqueleto.empty()
+st.session_state["_datos_listos"] = True
+_marcar("datos")
+
+if VALIDACION_ESTRICTA and not informe_calidad.empty:
+    st.error(f"Validación estricta: {len(informe_calidad)} hallazgo(s) de calidad en los "
+             "datos. Corrige los parquets o los diccionarios de códigos y regiones.")
+    st.dataframe(informe_calidad, hide_index=True)
+    st.stop()
 
 # ── Sidebar — filtros ────────────────────────────────────────────────
 
-anio_min = min(int(df_exp["Anio"].min()), int(df_imp["Anio"].min()))
-anio_max = max(int(df_exp["Anio"].max()), int(df_imp["Anio"].max()))
-
-st.sidebar.title("Filtros")
+anio_min, anio_max = catalogo["anios"]
 
 # Región
-regiones_disponibles = sorted(
-    {v[1] for v in country_map.values()},
-    key=lambda r: REGION_ORDER.index(r) if r in REGION_ORDER else 99,
-)
 region_sel = st.sidebar.selectbox(
-    "Región", ["Todas"] + regiones_disponibles
+    "Región", catalogo["regiones"]
 )
 
 # Período
@@ -413,22 +1086,15 @@ if anio_desde > anio_hasta:
     anio_desde, anio_hasta = anio_hasta, anio_desde
 rango = (int(anio_desde), int(anio_hasta))
 
-# ── Selector de país — área principal (filtrado por región) ───────────
+# Descargas
+formato_descarga = st.sidebar.radio(
+    "Formato de descarga", list(FORMATOS_DESCARGA), horizontal=True
+)
 
-TODOS_LABEL = "— Todos —"
+# ── Selector de país — área principal (filtrado por región) ───────────
 
-if region_sel == "Todas":
-    country_list = sorted(country_map.keys())
-    default_pais = "COLOMBIA"
-    if default_pais not in country_list:
-        default_pais = country_list[0] if country_list else ""
-    default_idx = country_list.index(default_pais) if default_pais in country_list else 0
-else:
-    paises_region = sorted(
-        [name for name, (_, reg) in country_map.items() if reg == region_sel]
-    )
-    country_list = [TODOS_LABEL] + paises_region
-    default_idx = 0  # "— Todos —" seleccionado por defecto al cambiar región
+country_list = catalogo["opciones"][region_sel]
+default_idx = catalogo["default_idx"][region_sel]
 
 st.markdown("### Selecciona un país socio comercial")
 pais_sel = st.selectbox(
@@ -444,29 +1110,30 @@ modo_region = (pais_sel == TODOS_LABEL)
 
 if modo_region:
     # Agrega todos los países de la región seleccionada
-    paises_en_region = {name for name, (_, reg) in country_map.items() if reg == region_sel}
-    norm_keys_region = {v[0] for name, v in country_map.items() if name in paises_en_region}
-    df_exp_pais = df_exp[
-        (df_exp["Pais_Norm"].isin(norm_keys_region)) &
-        (df_exp["Anio"] >= rango[0]) & (df_exp["Anio"] <= rango[1])
-    ]
-    df_imp_pais = df_imp[
-        (df_imp["Pais_Norm"].isin(norm_keys_region)) &
-        (df_imp["Anio"] >= rango[0]) & (df_imp["Anio"] <= rango[1])
-    ]
+    norm_keys = catalogo["claves"][region_sel]
     titulo_pais = f"{region_sel} (todos los países)"
 else:
-    norm_key, _ = country_map[pais_sel]
-    df_exp_pais = df_exp[
-        (df_exp["Pais_Norm"] == norm_key) &
-        (df_exp["Anio"] >= rango[0]) & (df_exp["Anio"] <= rango[1])
-    ]
-    df_imp_pais = df_imp[
-        (df_imp["Pais_Norm"] == norm_key) &
-        (df_imp["Anio"] >= rango[0]) & (df_imp["Anio"] <= rango[1])
-    ]
+    norm_key, _ = catalogo["pais"][pais_sel]
+    norm_keys = (norm_key,)
     titulo_pais = pais_sel
 
+agg_exp = agregar_exportaciones(df_exp, version_datos, norm_keys, rango,
+                                modo_region, MOSTRAR_VOLUMEN)
+agg_imp = agregar_importaciones(df_imp, version_datos, norm_keys, rango)
+
+# Usar todos los años del rango, rellenar con 0 si no hay datos
+all_years = pd.DataFrame({"Anio": range(rango[0], rango[1] + 1)})
+balance = (all_years
+           .merge(agg_exp["anual"], on="Anio", how="left")
+           .merge(agg_imp["anual"], on="Anio", how="left")
+           .fillna(0))
+balance["Saldo"] = balance["FOB"] - balance["CIF"]
+
+# Tablas descargables por sección; "Descargar todo" las junta en un ZIP
+prefijo_descarga = "balanza_{}_{}-{}".format(
+    re.sub(r"[^a-z0-9]+", "_", _normalizar(titulo_pais).lower()).strip("_"), *rango)
+tablas_descarga = {}
+
 # ── Título ───────────────────────────────────────────────────────────
 
 # Etiqueta corta reutilizable en los títulos de cada gráfico
@@ -477,15 +1144,15 @@ st.caption(f"{rango[0]}–{rango[1]}  |  Exportaciones FOB vs Importaciones CIF,
 
 # ── KPIs ─────────────────────────────────────────────────────────────
 
-exp_total = df_exp_pais["FOB"].sum()
-imp_total = df_imp_pais["CIF"].sum()
+exp_total = balance["FOB"].sum()
+imp_total = balance["CIF"].sum()
 saldo = exp_total - imp_total
 
 ultimo_anio = rango[1]
-exp_ult  = df_exp_pais[df_exp_pais["Anio"] == ultimo_anio]["FOB"].sum()
-imp_ult  = df_imp_pais[df_imp_pais["Anio"] == ultimo_anio]["CIF"].sum()
-exp_prev = df_exp_pais[df_exp_pais["Anio"] == ultimo_anio - 1]["FOB"].sum()
-imp_prev = df_imp_pais[df_imp_pais["Anio"] == ultimo_anio - 1]["CIF"].sum()
+exp_ult  = balance[balance["Anio"] == ultimo_anio]["FOB"].sum()
+imp_ult  = balance[balance["Anio"] == ultimo_anio]["CIF"].sum()
+exp_prev = balance[balance["Anio"] == ultimo_anio - 1]["FOB"].sum()
+imp_prev = balance[balance["Anio"] == ultimo_anio - 1]["CIF"].sum()
 delta_exp = ((exp_ult / exp_prev - 1) * 100) if exp_prev > 0 else None
 delta_imp = ((imp_ult / imp_prev - 1) * 100) if imp_prev > 0 else None
 
@@ -507,6 +1174,15 @@ k5.metric(f"Imp. {ultimo_anio}", f"${imp_ult:,.0f} M",
           delta=f"{delta_imp:+.1f}%" if delta_imp is not None else "—",
           delta_color="inverse")
 
+tablas_descarga["0_indicadores"] = pd.DataFrame({
+    "Indicador": ["Exportaciones FOB", "Importaciones CIF", "Saldo Comercial",
+                  f"Exp. {ultimo_anio}", f"Imp. {ultimo_anio}",
+                  f"Var. Exp. {ultimo_anio} (%)", f"Var. Imp. {ultimo_anio} (%)"],
+    "Valor": [exp_total, imp_total, saldo, exp_ult, imp_ult, delta_exp, delta_imp],
+})
+_boton_descarga({"0_indicadores": tablas_descarga["0_indicadores"]},
+                f"{prefijo_descarga}_indicadores", formato_descarga)
+
 st.divider()
 
 # ══════════════════════════════════════════════════════════════════════
@@ -515,16 +1191,6 @@ st.divider()
 
 st.subheader("1. Balanza Comercial Anual")
 
-exp_anual = df_exp_pais.groupby("Anio")["FOB"].sum().reset_index()
-imp_anual = df_imp_pais.groupby("Anio")["CIF"].sum().reset_index()
-# Usar todos los años del rango, rellenar con 0 si no hay datos
-all_years = pd.DataFrame({"Anio": range(rango[0], rango[1] + 1)})
-balance = (all_years
-           .merge(exp_anual, on="Anio", how="left")
-           .merge(imp_anual, on="Anio", how="left")
-           .fillna(0))
-balance["Saldo"] = balance["FOB"] - balance["CIF"]
-
 fig1 = go.Figure()
 fig1.add_trace(go.Bar(
     x=balance["Anio"], y=balance["FOB"],
@@ -558,7 +1224,10 @@ fig1.update_layout(
     margin=dict(t=50, b=60),
     hovermode="x unified",
 )
-st.plotly_chart(fig1, width="stretch")
+_mostrar_grafico(fig1, "fig1")
+
+tablas_descarga["1_balance_anual"] = balance
+_boton_descarga({"1_balance_anual": balance}, f"{prefijo_descarga}_balance", formato_descarga)
 
 st.divider()
 
@@ -568,21 +1237,15 @@ st.divider()
 
 st.subheader("2. ¿Qué le exportamos?")
 
-if df_exp_pais.empty:
+prod_total = agg_exp["prod_total"]
+
+if prod_total.empty:
     st.info("No hay exportaciones registradas hacia este destino en el período seleccionado.")
 else:
-    prod_total = (df_exp_pais.groupby("PP")["FOB"].sum()
-                  .sort_values(ascending=False).reset_index())
     top8 = prod_total.head(10)["PP"].tolist()
     n_resto_exp = prod_total[~prod_total["PP"].isin(top8)].shape[0]
     all_years_exp = pd.DataFrame({"Anio": range(rango[0], rango[1] + 1)})
-
-    exp_pivot = df_exp_pais.copy()
-    exp_pivot["PP_grupo"] = exp_pivot["PP"].where(exp_pivot["PP"].isin(top8), "RESTO")
-    exp_area = exp_pivot.groupby(["Anio", "PP_grupo"])["FOB"].sum().reset_index()
-    exp_area_total = exp_area.groupby("Anio")["FOB"].sum().rename("Total")
-    exp_area = exp_area.merge(exp_area_total, on="Anio")
-    exp_area["Pct"] = (exp_area["FOB"] / exp_area["Total"].replace(0, 1) * 100).round(1)
+    exp_area = agg_exp["area"]
 
     _xaxis_exp = dict(
         range=[rango[0] - 0.5, rango[1] + 0.5],
@@ -623,7 +1286,7 @@ else:
             legend=dict(orientation="h", y=-0.28, font=dict(size=9)),
             margin=dict(t=45, b=90), hovermode="x unified",
         )
-        st.plotly_chart(fig2a, width="stretch")
+        _mostrar_grafico(fig2a, "fig2a")
 
     # -- Gráfico % (stacked area, traces en orden inverso para que mayor quede arriba) --
     with col_exp_pct:
@@ -661,7 +1324,89 @@ else:
                        range=[0, 100], dtick=10, gridcolor=GRID_COLOR),
             margin=dict(t=45, b=90), hovermode="x unified",
         )
-        st.plotly_chart(fig2b, width="stretch")
+        _mostrar_grafico(fig2b, "fig2b")
+
+    # -- Volumen y valor unitario implícito (FOB / TM) --
+    if MOSTRAR_VOLUMEN:
+        pv_prod = agg_exp["volumen"]
+
+        col_exp_vol, col_exp_vu = st.columns(2)
+
+        with col_exp_vol:
+            st.caption("Volumen exportado (miles de toneladas métricas)")
+            fig2c = go.Figure()
+            for i, prod in enumerate(top8):
+                d = pv_prod[pv_prod["PP"] == prod]
+                fig2c.add_trace(go.Scatter(
+                    x=d["Anio"], y=d["TM"] / 1000, name=prod,
+                    mode="lines", line=dict(width=2, color=_get_product_color(prod, i)),
+                    hovertemplate=f"<b>{prod}</b><br>%{{y:,.1f}} mil TM<extra></extra>",
+                ))
+            fig2c.update_layout(
+                title=dict(text=f"Volumen exportado  ·  {ctx_label}", font=dict(size=12), x=0),
+                height=400, plot_bgcolor=PLOT_BG, xaxis=_xaxis_exp,
+                yaxis=dict(title="Miles de TM", tickformat=",.1f", gridcolor=GRID_COLOR),
+                legend=dict(orientation="h", y=-0.28, font=dict(size=9)),
+                margin=dict(t=45, b=90), hovermode="x unified",
+            )
+            _mostrar_grafico(fig2c, "fig2c")
+
+        with col_exp_vu:
+            st.caption("Valor unitario implícito (USD FOB por tonelada)")
+            fig2d = go.Figure()
+            for i, prod in enumerate(top8):
+                d = pv_prod[pv_prod["PP"] == prod]
+                fig2d.add_trace(go.Scatter(
+                    x=d["Anio"], y=d["VU"], name=prod,
+                    mode="lines", line=dict(width=2, color=_get_product_color(prod, i)),
+                    showlegend=False,
+                    hovertemplate=f"<b>{prod}</b><br>$%{{y:,.0f}} / TM<extra></extra>",
+                ))
+            fig2d.update_layout(
+                title=dict(text=f"Valor unitario implícito  ·  {ctx_label}", font=dict(size=12), x=0),
+                height=400, plot_bgcolor=PLOT_BG, xaxis=_xaxis_exp,
+                yaxis=dict(title="USD por TM", tickformat=",.0f", gridcolor=GRID_COLOR),
+                margin=dict(t=45, b=90), hovermode="x unified",
+            )
+            _mostrar_grafico(fig2d, "fig2d")
+
+        # -- Descomposición precio / volumen de la variación anual --
+        st.caption("Variación anual del FOB: efecto volumen vs efecto precio")
+        descomp = agg_exp["descomp"]
+        fig2e = go.Figure()
+        for col, nombre, color in [
+            ("Efecto_Volumen", "Efecto volumen", "#2563eb"),
+            ("Efecto_Precio", "Efecto precio", "#f59e0b"),
+            ("Efecto_Otros", "Altas, bajas y sin peso", RESTO_COLOR),
+        ]:
+            fig2e.add_trace(go.Bar(
+                x=descomp["Anio"], y=descomp[col], name=nombre, marker_color=color,
+                hovertemplate=f"{nombre}: $%{{y:,.1f}} M<extra></extra>",
+            ))
+        fig2e.add_trace(go.Scatter(
+            x=descomp["Anio"], y=descomp["Var_FOB"],
+            name="Variación FOB", mode="lines+markers",
+            line=dict(color="#000000", width=2, dash="dot"),
+            marker=dict(size=5),
+            hovertemplate="Variación: $%{y:,.1f} M<extra></extra>",
+        ))
+        fig2e.add_hline(y=0, line_dash="dash", line_color="#888", line_width=1)
+        fig2e.update_layout(
+            title=dict(text=f"Descomposición precio/volumen  ·  {ctx_label}", font=dict(size=12), x=0),
+            barmode="relative", height=400, plot_bgcolor=PLOT_BG, xaxis=_xaxis_exp,
+            yaxis=dict(title="Millones USD", tickformat=",.1f", gridcolor=GRID_COLOR),
+            legend=dict(orientation="h", y=-0.15),
+            margin=dict(t=45, b=60), hovermode="x unified",
+        )
+        _mostrar_grafico(fig2e, "fig2e")
+
+    tablas_exp = {"2_exportaciones_por_producto": prod_total,
+                  "2_exportaciones_anuales_top10": exp_area}
+    if "volumen" in agg_exp:
+        tablas_exp["2_volumen_valor_unitario"] = agg_exp["volumen"]
+        tablas_exp["2_descomposicion_precio_volumen"] = agg_exp["descomp"]
+    tablas_descarga.update(tablas_exp)
+    _boton_descarga(tablas_exp, f"{prefijo_descarga}_exportaciones", formato_descarga)
 
 st.divider()
 
@@ -671,22 +1416,15 @@ st.divider()
 
 st.subheader("3. ¿Qué le importamos?")
 
-if df_imp_pais.empty:
+sub_total = agg_imp["sub_total"]
+
+if sub_total.empty:
     st.info("No hay importaciones registradas desde este origen en el período seleccionado.")
 else:
-    sub_total = (df_imp_pais.groupby("Subgrupo")["CIF"].sum()
-                 .sort_values(ascending=False).reset_index())
     top8s = sub_total.head(10)["Subgrupo"].tolist()
     n_resto_imp = sub_total[~sub_total["Subgrupo"].isin(top8s)].shape[0]
     all_years_imp = pd.DataFrame({"Anio": range(rango[0], rango[1] + 1)})
-
-    imp_pivot = df_imp_pais.copy()
-    imp_pivot["Sub_grupo"] = imp_pivot["Subgrupo"].where(
-        imp_pivot["Subgrupo"].isin(top8s), "RESTO")
-    imp_area = imp_pivot.groupby(["Anio", "Sub_grupo"])["CIF"].sum().reset_index()
-    imp_area_total = imp_area.groupby("Anio")["CIF"].sum().rename("Total")
-    imp_area = imp_area.merge(imp_area_total, on="Anio")
-    imp_area["Pct"] = (imp_area["CIF"] / imp_area["Total"].replace(0, 1) * 100).round(1)
+    imp_area = agg_imp["area"]
 
     _xaxis_imp = dict(
         range=[rango[0] - 0.5, rango[1] + 0.5],
@@ -727,7 +1465,7 @@ else:
             legend=dict(orientation="h", y=-0.28, font=dict(size=9)),
             margin=dict(t=45, b=90), hovermode="x unified",
         )
-        st.plotly_chart(fig3a, width="stretch")
+        _mostrar_grafico(fig3a, "fig3a")
 
     # -- Gráfico % (stacked area, traces en orden inverso para que mayor quede arriba) --
     with col_imp_pct:
@@ -765,7 +1503,12 @@ else:
                        range=[0, 100], dtick=10, gridcolor=GRID_COLOR),
             margin=dict(t=45, b=90), hovermode="x unified",
         )
-        st.plotly_chart(fig3b, width="stretch")
+        _mostrar_grafico(fig3b, "fig3b")
+
+    tablas_imp = {"3_importaciones_por_subgrupo": sub_total,
+                  "3_importaciones_anuales_top10": imp_area}
+    tablas_descarga.update(tablas_imp)
+    _boton_descarga(tablas_imp, f"{prefijo_descarga}_importaciones", formato_descarga)
 
 st.divider()
 
@@ -779,10 +1522,8 @@ col_tm_exp, col_tm_imp = st.columns(2)
 
 with col_tm_exp:
     st.caption("Exportaciones: Sector → Producto Principal (FOB)")
-    if not df_exp_pais.empty:
-        tree_exp = (df_exp_pais.groupby(["Sector", "PP"])["FOB"].sum()
-                    .reset_index().rename(columns={"FOB": "FOB_total"}))
-        tree_exp = tree_exp[tree_exp["FOB_total"] > 0]
+    if not prod_total.empty:
+        tree_exp = _podar_hojas(agg_exp["tree"], "Sector", "PP", "FOB_total")
         if not tree_exp.empty:
             fig4a = px.treemap(
                 tree_exp, path=["Sector", "PP"], values="FOB_total",
@@ -798,16 +1539,16 @@ with col_tm_exp:
                 title=dict(text=f"Exportaciones FOB  ·  {ctx_label}", font=dict(size=12), x=0),
                 height=500, margin=dict(t=45, b=10, l=10, r=10),
             )
-            st.plotly_chart(fig4a, width="stretch")
+            _mostrar_grafico(fig4a, "fig4a")
+        else:
+            st.info("Sin montos positivos de exportaciones para este país y período.")
     else:
         st.info("Sin datos de exportaciones para este país y período.")
 
 with col_tm_imp:
     st.caption("Importaciones: Grupo CUODE → Subgrupo (CIF)")
-    if not df_imp_pais.empty:
-        tree_imp = (df_imp_pais.groupby(["Grupo", "Subgrupo"])["CIF"].sum()
-                    .reset_index().rename(columns={"CIF": "CIF_total"}))
-        tree_imp = tree_imp[tree_imp["CIF_total"] > 0]
+    if not sub_total.empty:
+        tree_imp = _podar_hojas(agg_imp["tree"], "Grupo", "Subgrupo", "CIF_total")
         if not tree_imp.empty:
             fig4b = px.treemap(
                 tree_imp, path=["Grupo", "Subgrupo"], values="CIF_total",
@@ -823,10 +1564,33 @@ with col_tm_imp:
                 title=dict(text=f"Importaciones CIF  ·  {ctx_label}", font=dict(size=12), x=0),
                 height=500, margin=dict(t=45, b=10, l=10, r=10),
             )
-            st.plotly_chart(fig4b, width="stretch")
+            _mostrar_grafico(fig4b, "fig4b")
+        else:
+            st.info("Sin montos positivos de importaciones para este país y período.")
     else:
         st.info("Sin datos de importaciones para este país y período.")
 
+# Tablas completas (sin la poda de hojas del gráfico)
+tablas_tree = {nombre: t for nombre, t in (("4_composicion_exportaciones", agg_exp["tree"]),
+                                           ("4_composicion_importaciones", agg_imp["tree"]))
+               if not t.empty}
+if tablas_tree:
+    tablas_descarga.update(tablas_tree)
+    _boton_descarga(tablas_tree, f"{prefijo_descarga}_composicion", formato_descarga)
+
+if not informe_calidad.empty:
+    tablas_descarga["0_calidad_datos"] = informe_calidad
+_boton_descarga(dict(sorted(tablas_descarga.items())), f"{prefijo_descarga}_todo",
+                formato_descarga, etiqueta="Descargar todo", contenedor=st.sidebar)
+
+# ── Calidad de datos ─────────────────────────────────────────────────
+
+if not informe_calidad.empty:
+    with st.expander(f"⚠️ Calidad de datos: {len(informe_calidad)} hallazgo(s)"):
+        st.caption("Registros y montos que la carga no pudo clasificar o que no cuadran "
+                   "con el parquet. Valor en millones USD (o en la unidad de la medida).")
+        st.dataframe(informe_calidad, hide_index=True)
+
 # ── Footer ───────────────────────────────────────────────────────────
 
 st.divider()
@@ -845,3 +1609,11 @@ st.markdown(
     "</div>",
     unsafe_allow_html=True,
 )
+
+# ── Instrumentación ──────────────────────────────────────────────────
+
+if INSTRUMENTACION:
+    _marcar("fin")
+    with st.sidebar.expander("Instrumentación"):
+        st.caption(f"Payload total: {sum(_metricas['payload_bytes'].values()) / 1024:,.1f} KB")
+        st.json(_metricas, expanded=False)
@@ -0,0 +1,106 @@
+"""
+Benchmark de arranque y rerun de app.py contra una réplica local recién levantada.
+
+Levanta `streamlit run app.py` con BALANZA_DEBUG=1 y mide con una sesión por
+websocket (ver prueba_carga.py):
+
+  import_ms         inicio del script → imports resueltos (marca "imports" de la app)
+  ttfb_ms           primera carga: envío del rerun → primer elemento recibido
+  shell_ms          marca "shell": sidebar y esqueleto ya enviados
+  datos_ms          marca "datos": parquets cargados y catálogo listo
+  primera_carga_ms  primera carga completa (cache frío), hasta script_finished
+  rerun_p50_ms      mediana de los reruns posteriores (cache caliente)
+  payload_kb        JSON de todos los gráficos de la primera carga
+  validacion_pct    costo de los chequeos de calidad sobre el resto de la carga
+                    de los parquets (solo con cache frío; None si vino de cache)
+
+Sale con código 1 si import_ms, ttfb_ms o validacion_pct superan su presupuesto.
+
+Uso:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --max-ttfb-ms 500 --reruns 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+from prueba_carga import _Sesion, _iniciar_servidor, _puerto_libre
+
+PRESUPUESTO_IMPORT_MS = 150
+PRESUPUESTO_TTFB_MS = 600
+PRESUPUESTO_VALIDACION_PCT = 5
+
+
+async def _medir(url, reruns):
+    async with connect(f"{url}/_stcore/stream", max_size=256 * 2**20) as ws:
+        sesion = _Sesion(ws)
+        t0 = time.perf_counter()
+        errores = await sesion.rerun()
+        primera_carga_ms = (time.perf_counter() - t0) * 1000
+        ttfb_ms = sesion.primer_delta_ms
+        metricas = json.loads(sesion.json[-1]) if sesion.json else {}
+
+        regiones = list(sesion.widgets["Región"].options)
+        latencias = []
+        for i in range(reruns):
+            sesion.fijar("Región", string_value=regiones[(i + 1) % len(regiones)])
+            t0 = time.perf_counter()
+            errores += await sesion.rerun()
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+    tiempos = metricas.get("tiempos_ms", {})
+    validacion = metricas.get("validacion_ms", {}).values()
+    chequeos_ms = sum(v["chequeos"] for v in validacion)
+    carga_ms = sum(v["carga"] for v in validacion)
+    return {
+        "import_ms": tiempos.get("imports"),
+        "ttfb_ms": round(ttfb_ms, 1),
+        "shell_ms": tiempos.get("shell"),
+        "datos_ms": tiempos.get("datos"),
+        "primera_carga_ms": round(primera_carga_ms, 1),
+        "rerun_p50_ms": round(statistics.median(latencias), 1) if latencias else None,
+        "payload_kb": round(sum(metricas.get("payload_bytes", {}).values()) / 1024, 1),
+        "validacion_pct": (round(chequeos_ms / (carga_ms - chequeos_ms) * 100, 2)
+                           if carga_ms > chequeos_ms else None),
+        "errores": errores[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=PRESUPUESTO_IMPORT_MS)
+    parser.add_argument("--max-ttfb-ms", type=float, default=PRESUPUESTO_TTFB_MS)
+    parser.add_argument("--max-validacion-pct", type=float, default=PRESUPUESTO_VALIDACION_PCT)
+    parser.add_argument("--timeout-arranque", type=float, default=120)
+    args = parser.parse_args()
+
+    puerto = _puerto_libre()
+    proc = _iniciar_servidor(puerto, args.timeout_arranque, env={"BALANZA_DEBUG": "1"})
+    try:
+        r = asyncio.run(_medir(f"ws://127.0.0.1:{puerto}", args.reruns))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    fallas = []
+    if r["import_ms"] is None or r["import_ms"] > args.max_import_ms:
+        fallas.append(f"import_ms > {args.max_import_ms:g}")
+    if r["ttfb_ms"] > args.max_ttfb_ms:
+        fallas.append(f"ttfb_ms > {args.max_ttfb_ms:g}")
+    if r["validacion_pct"] is not None and r["validacion_pct"] > args.max_validacion_pct:
+        fallas.append(f"validacion_pct > {args.max_validacion_pct:g}")
+    r["presupuesto"] = {"import_ms": args.max_import_ms, "ttfb_ms": args.max_ttfb_ms,
+                        "validacion_pct": args.max_validacion_pct, "fallas": fallas}
+    print(json.dumps(r, indent=2, ensure_ascii=False))
+    if fallas or r["errores"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Prueba de carga del dashboard: N sesiones concurrentes contra una réplica local.
+
+Levanta `streamlit run app.py` en localhost (o usa --url de una réplica ya
+corriendo) y abre N sesiones por websocket, hablando el mismo protocolo que
+el navegador. Cada sesión recorre al azar regiones, países (incluido
+"— Todos —") y rangos de años; cada interacción es un rerun completo y se
+mide desde el envío hasta `script_finished`.
+
+AppTest no sirve aquí: cada run crea y destruye el Runtime global, así que no
+admite sesiones concurrentes en un mismo proceso.
+
+Uso:
+    python scripts/prueba_carga.py --sesiones 8 --interacciones 20
+    python scripts/prueba_carga.py --sesiones 16 --max-p95-ms 1500   # falla si se excede
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from websockets.asyncio.client import connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+# ── Servidor ─────────────────────────────────────────────────────────
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _iniciar_servidor(puerto, timeout, env=None):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP,
+         "--server.headless", "true", "--server.address", "127.0.0.1",
+         "--server.port", str(puerto), "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, **(env or {})},
+    )
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("El servidor de Streamlit no respondió a tiempo")
+
+
+def _rss_mb(pid):
+    """RSS del proceso `pid` leído de /proc (Linux); None en otros sistemas."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# ── Sesión ───────────────────────────────────────────────────────────
+
+class _Sesion:
+    """Cliente mínimo del protocolo de Streamlit: guarda el estado de los
+    widgets como lo haría el navegador y lo reenvía en cada rerun."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.estados = {}   # id de widget → WidgetState enviado
+        self.widgets = {}   # label → proto del widget en el último run
+        self.page_hash = ""
+        self.primer_delta_ms = None  # del último rerun: envío → primer elemento recibido
+        self.json = []               # cuerpos de st.json del último rerun (instrumentación)
+
+    async def rerun(self):
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_hash
+        ids_vivos = {w.id for w in self.widgets.values()}
+        for wid, estado in self.estados.items():
+            if wid in ids_vivos:  # widgets recreados (p.ej. "País" con otras opciones) vuelven a su default
+                msg.rerun_script.widget_states.widgets.append(estado)
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+
+        widgets, errores = {}, []
+        self.primer_delta_ms, self.json = None, []
+        while True:
+            raw = await self.ws.recv()
+            fm = ForwardMsg()
+            fm.ParseFromString(raw)
+            tipo = fm.WhichOneof("type")
+            if tipo == "new_session":
+                self.page_hash = fm.new_session.page_script_hash
+            elif tipo == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                if self.primer_delta_ms is None:
+                    self.primer_delta_ms = (time.perf_counter() - t0) * 1000
+                el = fm.delta.new_element
+                campo = el.WhichOneof("type")
+                if campo in ("selectbox", "number_input"):
+                    w = getattr(el, campo)
+                    widgets[w.label] = w
+                elif campo == "json":
+                    self.json.append(el.json.body)
+                elif campo == "exception":
+                    errores.append(el.exception.message)
+            elif tipo == "script_finished":
+                break
+        self.widgets = widgets
+        return errores
+
+    def fijar(self, label, **valor):
+        estado = WidgetState(id=self.widgets[label].id, **valor)
+        self.estados[estado.id] = estado
+
+    def cambio_aleatorio(self, rnd):
+        accion = rnd.choice(["region", "pais", "rango"])
+        if accion == "region":
+            self.fijar("Región", string_value=rnd.choice(self.widgets["Región"].options))
+        elif accion == "pais":
+            self.fijar("País", string_value=rnd.choice(self.widgets["País"].options))
+        else:
+            desde = self.widgets["Desde"]
+            a, b = sorted(rnd.sample(range(int(desde.min), int(desde.max) + 1), 2))
+            self.fijar("Desde", double_value=a)
+            self.fijar("Hasta", double_value=b)
+
+
+async def _correr_sesion(idx, url, args, latencias, errores):
+    rnd = random.Random(args.semilla + idx)
+    async with connect(f"{url}/_stcore/stream", max_size=256 * 2**20) as ws:
+        sesion = _Sesion(ws)
+        errores.extend(await sesion.rerun())  # carga inicial, no cuenta como interacción
+        for _ in range(args.interacciones):
+            sesion.cambio_aleatorio(rnd)
+            t0 = time.perf_counter()
+            errores.extend(await sesion.rerun())
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+
+async def _muestrear_rss(pid, muestras):
+    while True:
+        rss = _rss_mb(pid)
+        if rss is not None:
+            muestras.append(rss)
+        await asyncio.sleep(0.25)
+
+
+async def _main(args, url, pid):
+    latencias, errores, rss = [], [], []
+    muestreo = asyncio.create_task(_muestrear_rss(pid, rss)) if pid else None
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_correr_sesion(i, url, args, latencias, errores)
+                           for i in range(args.sesiones)))
+    total_s = time.perf_counter() - t0
+    if muestreo:
+        muestreo.cancel()
+
+    latencias.sort()
+
+    def pct(p):
+        return latencias[min(len(latencias) - 1, int(p / 100 * len(latencias)))]
+
+    return {
+        "sesiones": args.sesiones,
+        "reruns": len(latencias),
+        "p50_ms": round(pct(50), 1),
+        "p95_ms": round(pct(95), 1),
+        "p99_ms": round(pct(99), 1),
+        "max_ms": round(latencias[-1], 1),
+        "reruns_por_s": round(len(latencias) / total_s, 2),
+        "rss_inicial_mb": round(rss[0], 1) if rss else None,
+        "rss_pico_mb": round(max(rss), 1) if rss else None,
+        "rss_final_mb": round(rss[-1], 1) if rss else None,
+        "errores": errores[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=8)
+    parser.add_argument("--interacciones", type=int, default=20,
+                        help="reruns por sesión después de la carga inicial")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--url", help="réplica ya corriendo, p.ej. ws://127.0.0.1:8501 "
+                                      "(sin RSS); por defecto se levanta una local")
+    parser.add_argument("--timeout-arranque", type=float, default=120)
+    parser.add_argument("--max-p95-ms", type=float,
+                        help="sale con código 1 si el p95 supera este valor")
+    args = parser.parse_args()
+
+    proc = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        puerto = _puerto_libre()
+        proc = _iniciar_servidor(puerto, args.timeout_arranque)
+        url = f"ws://127.0.0.1:{puerto}"
+    try:
+        r = asyncio.run(_main(args, url, proc.pid if proc else None))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    print(json.dumps(r, indent=2, ensure_ascii=False))
+    if r["errores"] or (args.max_p95_ms is not None and r["p95_ms"] > args.max_p95_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Validación de calidad de los parquets de data/, pensada para correr en el build.
+
+Ejecuta app.py una vez con AppTest, es decir la misma carga y los mismos
+chequeos vectorizados que la app (ver _validar_carga), y lista los hallazgos:
+
+  Código sin mapear          códigos fuera de SECTOR_MAP / GRUPO_MAP / SUBGRUPO_MAP
+  País sin región            países que caen en la región "Otros"
+  Valor nulo / negativo      en las medidas (FOB, TM, CIF) o en las claves
+  Clave duplicada            variantes de un mismo país o código tras normalizar
+  Total distinto al parquet  filas que la agregación de la carga descartó
+
+Con --estricta sale con código 1 si hay algún hallazgo.
+
+Uso:
+    python scripts/validar_datos.py
+    python scripts/validar_datos.py --estricta --csv informe_calidad.csv
+"""
+import argparse
+import os
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--estricta", action="store_true",
+                        help="sale con código 1 si hay hallazgos")
+    parser.add_argument("--csv", help="guarda el informe en este archivo")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    os.environ.pop("BALANZA_VALIDACION", None)
+    at = AppTest.from_file(APP, default_timeout=args.timeout).run()
+    if at.exception:
+        sys.exit(f"La app falló al cargar los datos: {at.exception[0].value}")
+    informe = at.session_state["_validacion"]
+
+    if informe.empty:
+        print("Sin hallazgos de calidad.")
+        return
+    print(informe.to_string(index=False))
+    print()
+    print(informe.groupby(["Flujo", "Chequeo"]).size().to_string())
+    if args.csv:
+        informe.to_csv(args.csv, index=False)
+    if args.estricta:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()